@@ -1,5 +1,11 @@
 """Patched workflows for compatibility"""
 
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+import nibabel as nb
+import numpy as np
 from nipype import logging
 from nipype.pipeline import engine as pe
 from nipype.interfaces import fsl, utility as niu
@@ -19,6 +25,16 @@ from ..utils import fix_multi_source_name
 
 LOGGER = logging.getLogger("nipype.workflow")
 
+# TemplateFlow template providing the tissue priors for FAST, in BIDS label order
+TPM_TEMPLATE = "Fischer344"
+TPM_LABELS = ("GM", "WM", "CSF")
+
+_S = slice(None)
+# The six boundary planes of a 3D volume, inspected to detect skull-stripping.
+# NIfTI stores data x-fastest, so the first z-plane is the only one readable without
+# going through the whole file; it comes first to allow a cheap early exit.
+FACE_SLICES = ((_S, _S, 0), (0, _S, _S), (-1, _S, _S), (_S, 0, _S), (_S, -1, _S), (_S, _S, -1))
+
 
 def init_anat_preproc_wf(
     *,
@@ -124,8 +140,6 @@ def init_anat_preproc_wf(
         Segmentation, resampled into MNI space
     std_tpms
         List of tissue probability maps in MNI space
-    subjects_dir
-        FreeSurfer SUBJECTS_DIR
     anat2std_xfm
         Nonlinear spatial transform to resample imaging data given in anatomical space
         into standard space.
@@ -134,7 +148,6 @@ def init_anat_preproc_wf(
     See Also
     --------
     * :py:func:`~niworkflows.anat.ants.init_brain_extraction_wf`
-    * :py:func:`~smriprep.workflows.surfaces.init_surface_recon_wf`
     """
     workflow = Workflow(name=name)
     num_t2w = len(t2w)
@@ -213,19 +226,6 @@ Anatomical preprocessing was reused from previously existing derivative objects.
         )
         workflow.connect(
             [
-                (
-                    inputnode,
-                    outputnode,
-                    [("subjects_dir", "subjects_dir"), ("subject_id", "subject_id")],
-                ),
-                (
-                    inputnode,
-                    anat_reports_wf,
-                    [
-                        ("subjects_dir", "inputnode.subjects_dir"),
-                        ("subject_id", "inputnode.subject_id"),
-                    ],
-                ),
                 (templatesource, stdselect, [("template", "key")]),
                 (
                     outputnode,
@@ -275,8 +275,8 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
 """
 
     workflow.__desc__ = desc.format(
-        ants_ver=ANTsInfo.version() or "(version unknown)",
-        fsl_ver=fsl.FAST().version or "(version unknown)",
+        ants_ver=_ants_version(),
+        fsl_ver=_fsl_version(),
         num_t2w=num_t2w,
         skullstrip_tpl=skull_strip_template.fullname,
     )
@@ -296,27 +296,7 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
 
     # 2. Brain-extraction and INU (bias field) correction.
     if skull_strip_mode == "auto":
-        import numpy as np
-        import nibabel as nb
-
-        def _is_skull_stripped(imgs):
-            """Check if T1w images are skull-stripped."""
-
-            def _check_img(img):
-                data = np.abs(nb.load(img).get_fdata(dtype=np.float32))
-                sidevals = (
-                    data[0, :, :].sum()
-                    + data[-1, :, :].sum()
-                    + data[:, 0, :].sum()
-                    + data[:, -1, :].sum()
-                    + data[:, :, 0].sum()
-                    + data[:, :, -1].sum()
-                )
-                return sidevals < 10
-
-            return all(_check_img(img) for img in imgs)
-
-        skull_strip_mode = _is_skull_stripped(t2w)
+        skull_strip_mode = _is_skull_stripped(t2w, omp_nthreads)
 
     if skull_strip_mode in (True, "skip"):
         raise NotImplementedError("Cannot run on already skull-stripped images.")
@@ -328,6 +308,14 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
             debug=debug
         )
 
+    # Brain extraction outputs lists; pick the first element in the main process
+    pick_corrected = pe.Node(
+        niu.Select(index=[0]), name="pick_corrected", run_without_submitting=True
+    )
+    pick_brain = pe.Node(
+        niu.Select(index=[0]), name="pick_brain", run_without_submitting=True
+    )
+
     # 3. Spatial normalization
     anat_norm_wf = init_anat_norm_wf(
         debug=debug,
@@ -343,8 +331,11 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
             ('outputnode.t1w_ref', 'in_file')]),
         (anat_validate, brain_extraction_wf, [
             ('out_file', 'inputnode.in_files')]),
-        (brain_extraction_wf, outputnode, [
-            (('outputnode.out_corrected', _pop), 't2w_preproc')]),
+        (brain_extraction_wf, pick_corrected, [
+            ('outputnode.out_corrected', 'inlist')]),
+        (brain_extraction_wf, pick_brain, [
+            ('outputnode.out_brain', 'inlist')]),
+        (pick_corrected, outputnode, [('out', 't2w_preproc')]),
         (anat_template_wf, outputnode, [
             ('outputnode.t1w_realign_xfm', 't2w_ref_xfms')]),
         (buffernode, outputnode, [('t2w_brain', 't2w_brain'),
@@ -353,8 +344,7 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
         (inputnode, anat_norm_wf, [
             (('t2w', fix_multi_source_name), 'inputnode.orig_t1w'),
             ('roi', 'inputnode.lesion_mask')]),
-        (brain_extraction_wf, anat_norm_wf, [
-            (('outputnode.out_corrected', _pop), 'inputnode.moving_image')]),
+        (pick_corrected, anat_norm_wf, [('out', 'inputnode.moving_image')]),
         (buffernode, anat_norm_wf, [('t2w_mask', 'inputnode.moving_mask')]),
         (anat_norm_wf, outputnode, [
             ('poutputnode.standardized', 'std_preproc'),
@@ -404,24 +394,19 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
     # fmt:on
 
     # 4. Brain tissue segmentation - FAST produces: 0 (bg), 1 (wm), 2 (csf), 3 (gm)
-    gm_tpm = get("Fischer344", label="GM", suffix="probseg")
-    wm_tpm = get("Fischer344", label="WM", suffix="probseg")
-    csf_tpm = get("Fischer344", label="CSF", suffix="probseg")
-
-    xfm_gm = pe.Node(
-        ApplyTransforms(input_image=_pop(gm_tpm), interpolation="MultiLabel"),
-        name="xfm_gm",
-    )
-    xfm_wm = pe.Node(
-        ApplyTransforms(input_image=_pop(wm_tpm), interpolation="MultiLabel"),
-        name="xfm_wm",
-    )
-    xfm_csf = pe.Node(
-        ApplyTransforms(input_image=_pop(csf_tpm), interpolation="MultiLabel"),
-        name="xfm_csf",
+    # Bring the template priors into T2w space, keeping their (GM, WM, CSF) order
+    xfm_priors = pe.MapNode(
+        ApplyTransforms(
+            interpolation="MultiLabel",
+            float=True,
+            num_threads=omp_nthreads,
+        ),
+        iterfield=["input_image"],
+        name="xfm_priors",
+        mem_gb=1,
+        n_procs=omp_nthreads,
     )
-
-    mrg_tpms = pe.Node(niu.Merge(3), name="mrg_tpms")
+    xfm_priors.inputs.input_image = list(_get_tpm_priors(TPM_TEMPLATE, TPM_LABELS))
 
     anat_dseg = pe.Node(
         FAST(
@@ -436,49 +421,51 @@ the brain-extracted T1w using `fast` [FSL {fsl_ver}, RRID:SCR_002823,
 
     # Change LookUp Table - BIDS wants: 0 (bg), 1 (gm), 2 (wm), 3 (csf)
     lut_anat_dseg = pe.Node(
-        niu.Function(function=_apply_bids_lut), name="lut_anat_dseg"
+        niu.Function(function=_apply_bids_lut),
+        name="lut_anat_dseg",
+        run_without_submitting=True,
     )
     lut_anat_dseg.inputs.lut = (0, 3, 2, 1)  # Maps: 0 -> 0, 3 -> 1, 2 -> 2, 1 -> 3
 
+    # Reorder probseg maps from FAST (CSF, WM, GM) to BIDS (GM, WM, CSF)
     fast2bids = pe.Node(
-        niu.Function(function=_probseg_fast2bids),
+        niu.Select(index=[2, 1, 0]),
         name="fast2bids",
         run_without_submitting=True,
     )
 
     # 5. Move native dseg & tpms back to standard space
-    xfm_dseg = pe.Node(ApplyTransforms(interpolation="MultiLabel"), name="xfm_dseg")
+    xfm_dseg = pe.Node(
+        ApplyTransforms(
+            interpolation="MultiLabel", float=True, num_threads=omp_nthreads
+        ),
+        name="xfm_dseg",
+        mem_gb=1,
+        n_procs=omp_nthreads,
+    )
     xfm_tpms = pe.MapNode(
         ApplyTransforms(
-            dimension=3, default_value=0, float=True, interpolation="Gaussian"
+            dimension=3,
+            default_value=0,
+            float=True,
+            interpolation="Gaussian",
+            num_threads=omp_nthreads,
         ),
         iterfield=["input_image"],
         name="xfm_tpms",
+        mem_gb=1,
+        n_procs=omp_nthreads,
     )
 
     # fmt:off
     workflow.connect([
         # step 4
-        (brain_extraction_wf, buffernode, [
-            (('outputnode.out_brain', _pop), 't2w_brain'),
-            ('outputnode.out_mask', 't2w_mask')]),
+        (pick_brain, buffernode, [('out', 't2w_brain')]),
+        (brain_extraction_wf, buffernode, [('outputnode.out_mask', 't2w_mask')]),
         (buffernode, anat_dseg, [('t2w_brain', 'in_files')]),
-        (brain_extraction_wf, xfm_gm, [(
-            ('outputnode.out_corrected', _pop), 'reference_image')]),
-        (brain_extraction_wf, xfm_wm, [(
-            ('outputnode.out_corrected', _pop), 'reference_image')]),
-        (brain_extraction_wf, xfm_csf, [(
-            ('outputnode.out_corrected', _pop), 'reference_image')]),
-        (anat_norm_wf, xfm_gm, [(
-            'outputnode.std2anat_xfm', 'transforms')]),
-        (anat_norm_wf, xfm_wm, [(
-            'outputnode.std2anat_xfm', 'transforms')]),
-        (anat_norm_wf, xfm_csf, [(
-            'outputnode.std2anat_xfm', 'transforms')]),
-        (xfm_gm, mrg_tpms, [('output_image', 'in1')]),
-        (xfm_wm, mrg_tpms, [('output_image', 'in2')]),
-        (xfm_csf, mrg_tpms, [('output_image', 'in3')]),
-        (mrg_tpms, anat_dseg, [('out', 'other_priors')]),
+        (pick_corrected, xfm_priors, [('out', 'reference_image')]),
+        (anat_norm_wf, xfm_priors, [('outputnode.std2anat_xfm', 'transforms')]),
+        (xfm_priors, anat_dseg, [('output_image', 'other_priors')]),
         (anat_dseg, lut_anat_dseg, [('partial_volume_map', 'in_dseg')]),
         (lut_anat_dseg, outputnode, [('out', 't2w_dseg')]),
         (anat_dseg, fast2bids, [('partial_volume_files', 'inlist')]),
@@ -593,7 +580,7 @@ nonlinear registration with `antsRegistration` (ANTs {ants_ver}),
 using brain-extracted versions of both T1w reference and the T1w template.
 The following template{tpls} selected for spatial normalization:
 """.format(
-            ants_ver=ANTsInfo.version() or "(version unknown)",
+            ants_ver=_ants_version(),
             targets="%s standard space%s"
             % (
                 defaultdict(
@@ -658,7 +645,11 @@ The following template{tpls} selected for spatial normalization:
     )
 
     registration = pe.Node(
-        RobustMNINormalization(float=True, flavor=["precise", "testing"][debug],),
+        RobustMNINormalization(
+            float=True,
+            flavor=["precise", "testing"][debug],
+            num_threads=omp_nthreads,
+        ),
         name="registration",
         n_procs=omp_nthreads,
         mem_gb=2,
@@ -668,12 +659,23 @@ The following template{tpls} selected for spatial normalization:
         ApplyTransforms(
             dimension=3,
             default_value=0,
+            float=True,
             interpolation="LanczosWindowedSinc",
+            num_threads=omp_nthreads,
         ),
         name="tpl_moving",
+        mem_gb=1,
+        n_procs=omp_nthreads,
     )
 
-    std_mask = pe.Node(ApplyTransforms(interpolation="MultiLabel"), name="std_mask")
+    std_mask = pe.Node(
+        ApplyTransforms(
+            interpolation="MultiLabel", float=True, num_threads=omp_nthreads
+        ),
+        name="std_mask",
+        mem_gb=1,
+        n_procs=omp_nthreads,
+    )
 
     # fmt:off
     workflow.connect([
@@ -736,10 +738,6 @@ def init_anat_reports_wf(*, output_dir, name="anat_reports_wf"):
         T1w image resampled to standard space
     std_mask
         Mask of skull-stripped template
-    subject_dir
-        FreeSurfer SUBJECTS_DIR
-    subject_id
-        FreeSurfer subject ID
     t1w_conform_report
         Conformation report
     t1w_preproc
@@ -769,8 +767,6 @@ def init_anat_reports_wf(*, output_dir, name="anat_reports_wf"):
         "template",
         "std_t1w",
         "std_mask",
-        "subject_id",
-        "subjects_dir",
     ]
     inputnode = pe.Node(niu.IdentityInterface(fields=inputfields), name="inputnode")
 
@@ -916,14 +912,6 @@ def init_anat_derivatives_wf(
         Segmentation, resampled into standard space
     std_tpms
         Tissue probability maps in standard space
-    t1w2fsnative_xfm
-        LTA-style affine matrix translating from T1w to
-        FreeSurfer-conformed subject space
-    fsnative2t1w_xfm
-        LTA-style affine matrix translating from FreeSurfer-conformed
-        subject space to T1w
-    surfaces
-        GIFTI surfaces (gray/white boundary, midthickness, pial, inflated)
     """
     from niworkflows.interfaces.utility import KeySelect
     from smriprep.interfaces import DerivativesDataSink
@@ -950,9 +938,6 @@ def init_anat_derivatives_wf(
                 "std_tpms",
                 "anat2std_xfm",
                 "std2anat_xfm",
-                "t1w2fsnative_xfm",
-                "fsnative2t1w_xfm",
-                "surfaces",
             ]
         ),
         name="inputnode",
@@ -1106,10 +1091,10 @@ def init_anat_derivatives_wf(
         )
 
         anat2std_mask = pe.Node(
-            ApplyTransforms(interpolation="MultiLabel"), name="anat2std_mask"
+            ApplyTransforms(interpolation="MultiLabel", float=True), name="anat2std_mask"
         )
         anat2std_dseg = pe.Node(
-            ApplyTransforms(interpolation="MultiLabel"), name="anat2std_dseg"
+            ApplyTransforms(interpolation="MultiLabel", float=True), name="anat2std_dseg"
         )
         anat2std_tpms = pe.MapNode(
             ApplyTransforms(
@@ -1213,15 +1198,73 @@ def init_anat_derivatives_wf(
     return workflow
 
 
-def _pop(inlist):
-    if isinstance(inlist, (list, tuple)):
-        return inlist[0]
-    return inlist
+@lru_cache(maxsize=None)
+def _ants_version():
+    """Query the ANTs version only once per process."""
+    try:
+        return ANTsInfo.version() or "(version unknown)"
+    except Exception:
+        return "(version unknown)"
+
+
+@lru_cache(maxsize=None)
+def _fsl_version():
+    """Query the FSL version only once per process."""
+    try:
+        return fsl.FAST().version or "(version unknown)"
+    except Exception:
+        return "(version unknown)"
+
+
+@lru_cache(maxsize=None)
+def _get_tpm_priors(template, labels):
+    """Query TemplateFlow for the probseg maps of ``labels`` only once per template."""
+    return tuple(
+        os.fspath(get(template, raise_empty=True, label=label, suffix="probseg"))
+        for label in labels
+    )
 
 
-def _probseg_fast2bids(inlist):
-    """Reorder a list of probseg maps from FAST (CSF, WM, GM) to BIDS (GM, WM, CSF)."""
-    return (inlist[2], inlist[1], inlist[0])
+def _check_img(img):
+    """Check whether the boundary planes of an image are (nearly) empty."""
+    dobj = nb.load(img).dataobj
+    sidevals = 0
+    for i, idx in enumerate(FACE_SLICES):
+        if i == 1 and str(img).endswith(".gz"):
+            # Every other plane needs the whole stream inflated, and each
+            # proxy access reopens the file: decompress it only once
+            dobj = np.asanyarray(dobj)
+        # Unscaled images keep their on-disk dtype (scaled ones come as float)
+        plane = np.abs(np.asarray(dobj[idx]))
+        if plane.dtype.kind == "i":
+            # abs() wraps around at the minimum integer, but its bits are
+            # still right when reinterpreted as unsigned
+            plane = plane.view(plane.dtype.str.replace("i", "u"))
+        sidevals += plane.sum(dtype=np.float64 if plane.dtype.kind == "f" else np.uint64)
+        # Whole-head images usually fail on the very first plane (NaNs fail too)
+        if not sidevals < 10:
+            return False
+    return True
+
+
+def _any_not_stripped(imgs, nthreads):
+    """Check images concurrently, stopping at the first one with a skull."""
+    if len(imgs) < 2 or nthreads < 2:
+        return not all(_check_img(img) for img in imgs)
+
+    with ThreadPoolExecutor(max_workers=min(len(imgs), nthreads)) as pool:
+        futures = [pool.submit(_check_img, img) for img in imgs]
+        for future in as_completed(futures):
+            if not future.result():
+                for pending in futures:
+                    pending.cancel()
+                return True
+    return False
+
+
+def _is_skull_stripped(imgs, nthreads=1):
+    """Check if T2w images are skull-stripped."""
+    return not _any_not_stripped(imgs, nthreads)
 
 
 def _empty_report(in_file=None):
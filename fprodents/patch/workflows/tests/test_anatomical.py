@@ -0,0 +1,91 @@
+""" Testing module for fprodents.patch.workflows.anatomical """
+import nibabel as nb
+import numpy as np
+import pytest
+
+from ..anatomical import _check_img, _is_skull_stripped
+
+
+def _write(path, data, slope=None):
+    nb.Nifti1Image(data, np.eye(4)).to_filename(str(path))
+    if slope is not None:
+        # nibabel recomputes scaling on save, so patch the header in place
+        hdr = nb.load(str(path)).header
+        hdr.set_slope_inter(slope, 0)
+        with open(path, "r+b") as fobj:
+            hdr.write_to(fobj)
+    return str(path)
+
+
+def _brain(shape=(10, 12, 8), dtype=np.int16):
+    data = np.zeros(shape, dtype=dtype)
+    data[2:-2, 2:-2, 2:-2] = 100
+    return data
+
+
+@pytest.mark.parametrize("ext", [".nii", ".nii.gz"])
+def test_check_img_stripped(tmp_path, ext):
+    assert _check_img(_write(tmp_path / f"brain{ext}", _brain()))
+
+
+@pytest.mark.parametrize("ext", [".nii", ".nii.gz"])
+@pytest.mark.parametrize("face", [0, 1, 2, 3, 4, 5])
+def test_check_img_not_stripped(tmp_path, ext, face):
+    data = _brain()
+    idx = [(0, ...), (-1, ...), (slice(None), 0), (slice(None), -1),
+           (..., 0), (..., -1)][face]
+    data[idx] = 5
+    assert not _check_img(_write(tmp_path / f"head{ext}", data))
+
+
+def test_check_img_int16_minimum(tmp_path):
+    data = _brain()
+    data[0, 0, 0] = np.iinfo(np.int16).min
+    assert not _check_img(_write(tmp_path / "wrap.nii", data))
+
+
+def test_check_img_float(tmp_path):
+    data = _brain(dtype=np.float32)
+    data[-1, 5, 4] = -9.5
+    assert _check_img(_write(tmp_path / "float.nii", data))
+    data[5, -1, 4] = -0.5
+    assert not _check_img(_write(tmp_path / "float.nii", data))
+
+
+@pytest.mark.parametrize("plane", [0, -1])
+def test_check_img_nan(tmp_path, plane):
+    data = _brain(dtype=np.float32)
+    data[..., plane] = 50
+    data[5, 5, plane] = np.nan
+    assert not _check_img(_write(tmp_path / "nan.nii", data))
+    data[..., plane] = 0
+    data[5, 5, plane] = np.nan
+    assert not _check_img(_write(tmp_path / "nan.nii", data))
+
+
+@pytest.mark.parametrize("value,slope,expected", [(20, 0.125, True), (2, 4.0, False)])
+def test_check_img_scaled(tmp_path, value, slope, expected):
+    # The corner voxel lies on three faces: the threshold applies to scaled values
+    data = _brain()
+    data[0, 0, 0] = value
+    fname = _write(tmp_path / "scaled.nii", data, slope=slope)
+    assert nb.load(fname).dataobj.slope == slope
+    assert _check_img(fname) is expected
+
+
+@pytest.mark.parametrize("nthreads", [1, 2, 4])
+def test_is_skull_stripped(tmp_path, nthreads):
+    head = _brain()
+    head[:, :, 0] = 50
+    stripped = [
+        _write(tmp_path / "brain1.nii", _brain()),
+        _write(tmp_path / "brain2.nii.gz", _brain()),
+    ]
+    with_head = stripped + [
+        _write(tmp_path / "head.nii.gz", head),
+        _write(tmp_path / "brain3.nii", _brain()),
+    ]
+
+    assert _is_skull_stripped(stripped, nthreads)
+    assert not _is_skull_stripped(with_head, nthreads)
+    assert not _is_skull_stripped(with_head[::-1], nthreads)